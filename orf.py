@@ -1,81 +1,602 @@
 import sys
 import os
-from pathlib import Path
+import io
+import queue
+import threading
+import time
+import socket
+import tarfile
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, CancelledError
+from concurrent.futures.process import BrokenProcessPool
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QListWidget, QProgressBar,
+                             QPushButton, QLabel, QListView, QProgressBar,
                              QSpinBox, QCheckBox, QGroupBox, QFileDialog, 
-                             QMessageBox, QWidget, QSplitter, QTextEdit)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+                             QMessageBox, QWidget, QSplitter, QPlainTextEdit, QComboBox)
+from PyQt5.QtCore import Qt, QThread, QTimer, QSocketNotifier, QStringListModel, pyqtSignal
+import numpy as np
 import rawpy
 import imageio
 
+# libjpeg-turbo заметно быстрее кодировщика Pillow; без него - откат на imageio
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420, TJSAMP_422, TJSAMP_444
+    _TJ_SUBSAMPLING = {"4:2:0": TJSAMP_420, "4:2:2": TJSAMP_422, "4:4:4": TJSAMP_444}
+except ImportError:
+    TurboJPEG = None
+
+# Прореживание цветности JPG: 4:2:0 вчетверо сокращает работу DCT по цвету
+# и уменьшает файл; значения Pillow для запасного пути через imageio
+CHROMA_SUBSAMPLING = {"4:2:0": 2, "4:2:2": 1, "4:4:4": 0}
+DEFAULT_CHROMA = "4:2:0"
+
+# Состояние GPU-кодировщика, общее для процессов пула. Контекст CUDA
+# занимает сотни мегабайт видеопамяти, поэтому nvJPEG получает только
+# один процесс пула, а остальные кодируют на CPU
+GPU_UNCLAIMED = 0
+GPU_UNAVAILABLE = 1
+GPU_ACTIVE = 2
+GPU_FAILED = 3
+
+# Кодировщики и настройки пакета задаются один раз на процесс пула в _init_worker
+_tj = None
+_nj = None
+_gpu_state = None
+_quality = 95
+_chroma = DEFAULT_CHROMA
+_params = None
+
+def _init_worker(quality=95, preset=None, chroma=DEFAULT_CHROMA, gpu_state=None):
+    """Инициализирует процесс пула: кодировщики и настройки живут все время работы пула"""
+    global _tj, _nj, _gpu_state, _quality, _chroma, _params
+    _quality = quality
+    _chroma = chroma
+    _params = rawpy.Params(**POSTPROCESS_PRESETS[preset or DEFAULT_PRESET])
+    
+    if TurboJPEG is not None:
+        try:
+            _tj = TurboJPEG()
+        except (OSError, RuntimeError):
+            _tj = None
+    
+    # Кодирование на GPU через nvJPEG (pynvjpeg) на машинах с CUDA;
+    # GPU занимает первый инициализированный процесс
+    _gpu_state = gpu_state
+    if gpu_state is None:
+        return
+    with gpu_state.get_lock():
+        if gpu_state.value != GPU_UNCLAIMED:
+            return
+        try:
+            from nvjpeg import NvJpeg
+        except ImportError:
+            gpu_state.value = GPU_UNAVAILABLE
+            return
+        try:
+            _nj = NvJpeg()
+            gpu_state.value = GPU_ACTIVE
+        except Exception:
+            gpu_state.value = GPU_FAILED
+
+# Режимы постобработки LibRaw: половинный размер с билинейной интерполяцией
+# в разы дешевле полного AHD демозаика, которого достаточно не всегда
+POSTPROCESS_PRESETS = {
+    "Быстро": dict(demosaic_algorithm=rawpy.DemosaicAlgorithm.LINEAR, half_size=True,
+                   use_camera_wb=True, no_auto_bright=True, output_bps=8),
+    "Баланс": dict(demosaic_algorithm=rawpy.DemosaicAlgorithm.PPG,
+                   use_camera_wb=True, output_bps=8),
+    "Лучшее": dict(demosaic_algorithm=rawpy.DemosaicAlgorithm.AHD, output_bps=8),
+}
+DEFAULT_PRESET = "Лучшее"
+
+def _swap_red_blue(rgb, rows=64):
+    """Меняет местами каналы R и B на месте.
+
+    Работает блоками строк: numpy копирует перекрывающуюся правую часть
+    присваивания во временный буфер, и он остается размером с блок.
+    """
+    for start in range(0, rgb.shape[0], rows):
+        block = rgb[start:start + rows]
+        block[..., ::2] = block[..., 2::-2]
+
+def _encode_jpeg(rgb, quality, chroma=DEFAULT_CHROMA):
+    """Кодирует RGB массив в JPG: nvJPEG, затем libjpeg-turbo, затем imageio"""
+    global _nj
+    # Кодировщики читают буфер массива напрямую, без копирования; rawpy
+    # отдает C-непрерывный массив, так что здесь копия не создается.
+    # Для nvJPEG массив временно переводится в BGR на месте
+    rgb = np.ascontiguousarray(rgb)
+    
+    # nvjpeg всегда кодирует с прореживанием 4:2:0
+    if _nj is not None and chroma == "4:2:0":
+        # nvjpeg ожидает порядок каналов BGR, как в OpenCV; меняем каналы
+        # на месте, а не копией всего кадра
+        swapped = False
+        try:
+            _swap_red_blue(rgb)
+            swapped = True
+            return _nj.encode(rgb, quality)
+        except Exception:
+            # Запасным кодировщикам снова нужен RGB
+            if swapped:
+                _swap_red_blue(rgb)
+            # Отказавший GPU больше не используем; GUI сообщит об этом в логе
+            _nj = None
+            _gpu_state.value = GPU_FAILED
+    
+    if _tj is not None:
+        try:
+            return _tj.encode(rgb, quality=quality, pixel_format=TJPF_RGB,
+                              jpeg_subsample=_TJ_SUBSAMPLING[chroma])
+        except Exception:
+            # Некоторые изображения libjpeg-turbo не принимает
+            pass
+    
+    return imageio.imsave('<bytes>', rgb, format='jpeg', quality=quality,
+                          subsampling=CHROMA_SUBSAMPLING[chroma])
+
+def _iter_orf(root):
+    """Рекурсивно обходит папку одним проходом и выдает пути к ORF файлам.
+
+    Недоступные папки (например, System Volume Information на карте
+    памяти) пропускаются, как это делал Path.rglob.
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith('.orf'):
+                        yield entry.path
+        except OSError:
+            continue
+
+def _read_file(file_path):
+    """Читает ORF файл в память целиком.
+
+    LibRaw при чтении по имени файла делает множество мелких чтений
+    вразнобой; один последовательный проход намного быстрее на HDD и
+    сетевых дисках, а декодирование затем идет из памяти через BytesIO.
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        return f.read()
+
+def _write_file(output_path, data):
+    """Записывает готовый JPG напрямую через дескриптор, без буферов Python.
+
+    Данные пишутся во временный файл рядом и переименовываются в итоговое
+    имя только после успешной записи: оборванная запись (нет места, обрыв
+    сети) не оставляет недописанный JPG, который потом сочли бы актуальным.
+    """
+    tmp_path = output_path + '.part'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        try:
+            # Обычно хватает одного вызова, но на сетевых дисках запись может быть частичной
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _convert_one(raw_data):
+    """Декодирует содержимое ORF файла и кодирует его в JPG (выполняется в процессе пула).
+
+    Качество и параметры LibRaw заданы в _init_worker, так что в задачу
+    передаются только байты файла. Возвращает байты JPG; ошибки
+    пробрасываются через future.
+    """
+    with rawpy.imread(io.BytesIO(raw_data)) as raw:
+        rgb = raw.postprocess(params=_params)
+    
+    # Кодируем после закрытия LibRaw, чтобы его буферы не жили вместе с RGB
+    return _encode_jpeg(rgb, _quality, _chroma)
+
+# ProcessPoolExecutor на Windows не принимает больше 61 процесса;
+# на других системах ограничения нет
+MAX_WORKERS = 61 if sys.platform == 'win32' else None
+
+# Сообщения лога отправляются в GUI не чаще, чем раз в LOG_FLUSH_INTERVAL
+# секунд или пачками по LOG_BATCH_SIZE строк
+LOG_BATCH_SIZE = 50
+LOG_FLUSH_INTERVAL = 0.25
+
+# Имя архива при упаковке всех JPG в один .tar; существующие архивы
+# не перезаписываются - к имени добавляется номер
+TAR_NAME = 'converted.tar'
+
+def _open_new_archive(output_dir):
+    """Создает в папке новый архив, не затирая существующие.
+
+    Возвращает (tarfile, имя архива).
+    """
+    stem, ext = os.path.splitext(TAR_NAME)
+    counter = 0
+    while True:
+        archive_name = f"{stem}_{counter}{ext}" if counter else TAR_NAME
+        try:
+            fileobj = open(os.path.join(output_dir, archive_name), 'xb', buffering=1 << 20)
+        except FileExistsError:
+            counter += 1
+            continue
+        return tarfile.open(fileobj=fileobj, mode='w'), archive_name
+
+# Метка для стадии записи: JPG уже актуален, файл пропущен
+_UP_TO_DATE = object()
+
 class ConversionThread(QThread):
-    """Поток для конвертации файлов"""
-    progress = pyqtSignal(int)
+    """Поток для конвертации файлов.
+
+    Конвейер из трех стадий, связанных ограниченными очередями:
+    поток чтения -> пул процессов (демозаик + JPEG) -> поток записи.
+    Диск, ядра декодирования и запись заняты одновременно.
+    
+    Прогресс передается не сигналом, а байтом на каждый обработанный файл
+    в progress_sock; GUI читает их пачками через QSocketNotifier.
+    """
     log_message = pyqtSignal(str)
     finished_signal = pyqtSignal(bool)
     
-    def __init__(self, file_list, output_dir, quality, delete_original=False):
+    def __init__(self, file_list, output_dir, quality, delete_original=False, workers=None,
+                 preset=DEFAULT_PRESET, pack_tar=False, progress_sock=None,
+                 chroma=DEFAULT_CHROMA, skip_up_to_date=False):
         super().__init__()
         self.file_list = file_list
         self.output_dir = output_dir
         self.quality = quality
+        self.preset = preset
+        self.chroma = chroma
+        self.skip_up_to_date = skip_up_to_date
         self.delete_original = delete_original
+        self.pack_tar = pack_tar
+        self.progress_sock = progress_sock
+        self.workers = workers or os.cpu_count() or 1
+        if MAX_WORKERS is not None:
+            self.workers = min(self.workers, MAX_WORKERS)
+        self.executor = None
+        self._retry_executor = None
+        self._retry_backlog = collections.deque()
+        self._retry_running = False
+        self._gpu_state = None
+        self._gpu_reported = set()
+        self.successful = 0
+        self.skipped = 0
+        self.archive = None
+        self.archive_error = None
         self.is_running = True
         
     def run(self):
         try:
             total_files = len(self.file_list)
-            successful = 0
+            self.successful = 0
+            self.skipped = 0
             
-            for i, file_path in enumerate(self.file_list):
+            # Имена файлов вычисляем один раз: (путь, имя, имя JPG)
+            jobs = []
+            for file_path in self.file_list:
+                name = os.path.basename(file_path)
+                jobs.append((file_path, name, name.rsplit('.', 1)[0] + '.jpg'))
+            
+            # Без OpenMP LibRaw выполняет демозаик в один поток
+            if not (getattr(rawpy, 'flags', None) or {}).get('OPENMP', True):
+                self.log_message.emit("⚠ rawpy собран без OpenMP, демозаик будет однопоточным")
+            
+            # Небольшие очереди ограничивают число файлов в памяти
+            max_in_flight = 2 * self.workers
+            read_q = queue.Queue(maxsize=max_in_flight)
+            write_q = queue.Queue(maxsize=self.workers)
+            
+            # Архив создается стадией записи при первом готовом JPG
+            self.archive = None
+            self.archive_error = None
+            deferred_removals = []
+            
+            reader = threading.Thread(target=self._read_files, args=(jobs, read_q, write_q), daemon=True)
+            writer = threading.Thread(target=self._write_files,
+                                      args=(write_q, deferred_removals),
+                                      daemon=True)
+            
+            self.executor = self._create_executor()
+            try:
+                reader.start()
+                writer.start()
+                pending = {}
+                
+                while True:
+                    item = read_q.get()
+                    if item is None:
+                        break
+                    if not self.is_running:
+                        # Продолжаем разбирать очередь, чтобы не заблокировать поток чтения
+                        continue
+                    
+                    job, raw_data = item
+                    try:
+                        future = self._submit(raw_data)
+                    except RuntimeError as e:
+                        if self.is_running:
+                            write_q.put((job, None, e))
+                        # Иначе пул уже остановлен пользователем
+                        continue
+                    pending[future] = (job, raw_data, False)
+                    
+                    if len(pending) >= max_in_flight:
+                        self._collect_results(write_q, pending)
+                
+                while pending:
+                    self._collect_results(write_q, pending)
+            finally:
+                self.executor.shutdown()
+                if self._retry_executor is not None:
+                    self._retry_executor.shutdown()
+                write_q.put(None)
+                writer.join()
+                if self.archive is not None:
+                    try:
+                        self.archive.close()
+                    finally:
+                        self.archive.fileobj.close()
+            
+            # Оригиналы удаляем только после того, как архив полностью записан
+            self._remove_originals(deferred_removals)
+            
+            self.finished_signal.emit(True)
+            summary = f"Конвертация завершена! Успешно: {self.successful}/{total_files}"
+            if self.skipped:
+                summary += f", пропущено актуальных: {self.skipped}"
+            self.log_message.emit(summary)
+            
+        except Exception as e:
+            self.log_message.emit(f"Критическая ошибка: {str(e)}")
+            self.finished_signal.emit(False)
+    
+    def _create_executor(self, max_workers=None, use_gpu=True):
+        # Процессы, а не потоки: LibRaw не всегда отпускает GIL,
+        # а кодирование JPEG упирается в CPU
+        ctx = multiprocessing.get_context('spawn')
+        gpu_state = None
+        if use_gpu:
+            self._gpu_state = gpu_state = ctx.Value('i', GPU_UNCLAIMED)
+        return ProcessPoolExecutor(
+            max_workers=max_workers or self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.quality, self.preset, self.chroma, gpu_state)
+        )
+    
+    def _submit(self, raw_data):
+        """Отправляет файл в пул.
+
+        Если процесс пула аварийно завершился (например, LibRaw упал на
+        поврежденном файле), пул становится непригодным - создаем новый.
+        Задачи, бывшие в работе, перезапускает _collect_results.
+        """
+        try:
+            return self.executor.submit(_convert_one, raw_data)
+        except BrokenProcessPool:
+            if not self.is_running:
+                raise
+            self.executor.shutdown(wait=False)
+            self.executor = self._create_executor()
+            return self.executor.submit(_convert_one, raw_data)
+    
+    def _read_files(self, jobs, read_q, write_q):
+        """Стадия чтения: загружает ORF файлы в память целиком"""
+        # В архиве отдельных JPG нет, сравнивать не с чем
+        check_outputs = self.skip_up_to_date and not self.pack_tar
+        try:
+            for job in jobs:
                 if not self.is_running:
                     break
-                    
+                if check_outputs and self._is_up_to_date(job):
+                    write_q.put((job, _UP_TO_DATE, None))
+                    continue
                 try:
-                    self.log_message.emit(f"Конвертация: {os.path.basename(file_path)}")
-                    
-                    # Конвертация ORF в JPG
-                    with rawpy.imread(file_path) as raw:
-                        rgb = raw.postprocess()
-                    
-                    # Создаем имя выходного файла
-                    output_filename = Path(file_path).stem + '.jpg'
-                    output_path = os.path.join(self.output_dir, output_filename)
+                    raw_data = _read_file(job[0])
+                except OSError as e:
+                    write_q.put((job, None, e))
+                    continue
+                read_q.put((job, raw_data))
+        finally:
+            read_q.put(None)
+    
+    def _is_up_to_date(self, job):
+        """Проверяет, что непустой JPG уже существует и не старше исходного ORF"""
+        file_path, _, output_filename = job
+        try:
+            out_stat = os.stat(os.path.join(self.output_dir, output_filename))
+            return out_stat.st_size > 0 and out_stat.st_mtime >= os.stat(file_path).st_mtime
+        except OSError:
+            # Нет JPG или его не прочитать - конвертируем заново, ошибки
+            # доступа к самому ORF проявятся при чтении
+            return False
+    
+    def _collect_results(self, write_q, pending):
+        """Ждет завершения хотя бы одной задачи и передает результаты на стадию записи.
+
+        pending: future -> (job, байты файла, признак повторного запуска).
+        Когда процесс пула падает, ошибку получают все задачи, бывшие в
+        работе, и виновника среди них не определить. Поэтому такие файлы
+        перезапускаются по одному в отдельном однопроцессном пуле: ошибку
+        получит только файл, который роняет процесс и там.
+        """
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        self._report_gpu_state()
+        for future in done:
+            job, raw_data, retried = pending.pop(future)
+            if retried:
+                self._retry_running = False
+            try:
+                write_q.put((job, future.result(), None))
+            except CancelledError:
+                pass
+            except BrokenProcessPool as e:
+                if retried or not self.is_running:
+                    write_q.put((job, None, e))
+                else:
+                    self._retry_backlog.append((job, raw_data))
+            except Exception as e:
+                write_q.put((job, None, e))
+        
+        # Следующий файл на перепроверку - только когда предыдущий завершился
+        while self._retry_backlog and not self._retry_running and self.is_running:
+            job, raw_data = self._retry_backlog.popleft()
+            try:
+                future = self._submit_retry(raw_data)
+            except RuntimeError as e:
+                write_q.put((job, None, e))
+                continue
+            pending[future] = (job, raw_data, True)
+            self._retry_running = True
+    
+    def _submit_retry(self, raw_data):
+        """Запускает файл из упавшего пула в отдельном однопроцессном пуле"""
+        if self._retry_executor is None:
+            self._retry_executor = self._create_executor(max_workers=1, use_gpu=False)
+        try:
+            return self._retry_executor.submit(_convert_one, raw_data)
+        except BrokenProcessPool:
+            self._retry_executor.shutdown(wait=False)
+            self._retry_executor = self._create_executor(max_workers=1, use_gpu=False)
+            return self._retry_executor.submit(_convert_one, raw_data)
+    
+    def _report_gpu_state(self):
+        """Однократно сообщает в лог, что JPG кодируется на GPU или что nvJPEG отказал"""
+        state = self._gpu_state.value
+        if state not in (GPU_ACTIVE, GPU_FAILED) or state in self._gpu_reported:
+            return
+        self._gpu_reported.add(state)
+        if state == GPU_ACTIVE:
+            self.log_message.emit("JPG кодируется на GPU (nvJPEG) в одном из процессов")
+        else:
+            self.log_message.emit("⚠ nvJPEG недоступен, JPG кодируется на CPU")
+    
+    def _write_files(self, write_q, deferred_removals=None):
+        """Стадия записи: сохраняет JPG и удаляет оригиналы.
+
+        Сообщения лога копятся и отправляются в GUI пачками, чтобы не
+        забивать очередь событий Qt.
+        """
+        log_batch = []
+        last_flush = time.monotonic()
+        
+        def flush_log():
+            nonlocal last_flush
+            if log_batch:
+                self.log_message.emit("\n".join(log_batch))
+                log_batch.clear()
+            last_flush = time.monotonic()
+        
+        while True:
+            try:
+                item = write_q.get(timeout=LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                flush_log()
+                continue
+            if item is None:
+                break
+            if not self.is_running:
+                continue
+            
+            (file_path, name, output_filename), jpeg_bytes, error = item
+            if jpeg_bytes is _UP_TO_DATE:
+                self.skipped += 1
+                log_batch.append(f"⏭ Пропущен (актуальный): {output_filename}")
+            else:
+                try:
+                    if error is not None:
+                        raise error
                     
-                    # Сохраняем JPG
-                    imageio.imsave(output_path, rgb, quality=self.quality)
-                    successful += 1
+                    # Сохраняем JPG; один последовательно записываемый архив вместо
+                    # тысяч отдельных файлов - заметно быстрее на сетевых дисках и HDD
+                    if self.pack_tar:
+                        if self.archive_error is not None:
+                            raise RuntimeError(f"архив поврежден предыдущей ошибкой записи: {self.archive_error}")
+                        if self.archive is None:
+                            self.archive, archive_name = _open_new_archive(self.output_dir)
+                            log_batch.append(f"Архив: {archive_name}")
+                        info = tarfile.TarInfo(output_filename)
+                        info.size = len(jpeg_bytes)
+                        info.mtime = time.time()
+                        try:
+                            self.archive.addfile(info, io.BytesIO(jpeg_bytes))
+                        except Exception as e:
+                            # Заголовок и часть данных уже записаны, а смещение tarfile
+                            # не сдвинулось: следующие файлы легли бы в архив со сдвигом.
+                            # Архив считаем испорченным, оригиналы в этом запуске не удаляем
+                            self.archive_error = e
+                            if self.delete_original:
+                                log_batch.append("⚠ Ошибка записи архива: оригиналы не будут удалены")
+                                deferred_removals.clear()
+                            raise
+                    else:
+                        _write_file(os.path.join(self.output_dir, output_filename), jpeg_bytes)
+                    self.successful += 1
                     
                     # Удаляем оригинал если нужно
-                    if self.delete_original:
+                    if self.delete_original and self.pack_tar and self.archive_error is None:
+                        deferred_removals.append((file_path, name))
+                    elif self.delete_original:
                         os.remove(file_path)
-                        self.log_message.emit(f"Удален оригинал: {os.path.basename(file_path)}")
+                        log_batch.append(f"Удален оригинал: {name}")
                     
-                    self.log_message.emit(f"✅ Успешно: {output_filename}")
+                    log_batch.append(f"✅ Успешно: {output_filename}")
                     
                 except Exception as e:
-                    self.log_message.emit(f"❌ Ошибка {os.path.basename(file_path)}: {str(e)}")
-                
-                # Обновляем прогресс
-                progress = int((i + 1) / total_files * 100)
-                self.progress.emit(progress)
+                    log_batch.append(f"❌ Ошибка {name}: {str(e)}")
             
-            self.finished_signal.emit(True)
-            self.log_message.emit(f"Конвертация завершена! Успешно: {successful}/{total_files}")
+            # Обновляем прогресс
+            if self.progress_sock is not None:
+                self.progress_sock.sendall(b'.')
             
-        except Exception as e:
-            self.log_message.emit(f"Критическая ошибка: {str(e)}")
-            self.finished_signal.emit(False)
+            if (len(log_batch) >= LOG_BATCH_SIZE
+                    or time.monotonic() - last_flush >= LOG_FLUSH_INTERVAL):
+                flush_log()
+        
+        flush_log()
+    
+    def _remove_originals(self, removals):
+        """Удаляет оригиналы файлов, упакованных в архив"""
+        messages = []
+        for file_path, name in removals:
+            try:
+                os.remove(file_path)
+                messages.append(f"Удален оригинал: {name}")
+            except OSError as e:
+                messages.append(f"❌ Ошибка удаления {name}: {str(e)}")
+        if messages:
+            self.log_message.emit("\n".join(messages))
     
     def stop(self):
         self.is_running = False
+        # Снимаем с очереди еще не начатые задачи; запущенные дождется run()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._retry_executor is not None:
+            self._retry_executor.shutdown(wait=False, cancel_futures=True)
 
 class ORFConverterApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.file_list = []
         self.conversion_thread = None
+        self._log_scroll_pending = False
         self.init_ui()
         
     def init_ui(self):
@@ -113,7 +634,9 @@ class ORFConverterApp(QMainWindow):
         file_selection_layout.addStretch()
         
         # Список файлов
-        self.file_list_widget = QListWidget()
+        self._files_model = QStringListModel()
+        self.file_list_view = QListView()
+        self.file_list_view.setModel(self._files_model)
         
         # Настройки конвертации
         settings_group = QGroupBox("Настройки конвертации")
@@ -128,6 +651,30 @@ class ORFConverterApp(QMainWindow):
         self.quality_spinbox.setSuffix("%")
         quality_layout.addWidget(self.quality_spinbox)
         
+        # Количество процессов
+        workers_layout = QVBoxLayout()
+        workers_layout.addWidget(QLabel("Процессов:"))
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, MAX_WORKERS or max(64, os.cpu_count() or 1))
+        self.workers_spinbox.setValue(os.cpu_count() or 1)
+        workers_layout.addWidget(self.workers_spinbox)
+        
+        # Режим обработки RAW
+        preset_layout = QVBoxLayout()
+        preset_layout.addWidget(QLabel("Обработка RAW:"))
+        self.preset_combo = QComboBox()
+        self.preset_combo.addItems(POSTPROCESS_PRESETS.keys())
+        self.preset_combo.setCurrentText(DEFAULT_PRESET)
+        preset_layout.addWidget(self.preset_combo)
+        
+        # Прореживание цветности
+        chroma_layout = QVBoxLayout()
+        chroma_layout.addWidget(QLabel("Цветность JPG:"))
+        self.chroma_combo = QComboBox()
+        self.chroma_combo.addItems(CHROMA_SUBSAMPLING.keys())
+        self.chroma_combo.setCurrentText(DEFAULT_CHROMA)
+        chroma_layout.addWidget(self.chroma_combo)
+        
         # Папка назначения
         output_layout = QVBoxLayout()
         output_layout.addWidget(QLabel("Папка для сохранения:"))
@@ -142,8 +689,16 @@ class ORFConverterApp(QMainWindow):
         options_layout = QVBoxLayout()
         self.delete_original_checkbox = QCheckBox("Удалить оригинальные ORF файлы после конвертации")
         options_layout.addWidget(self.delete_original_checkbox)
+        self.pack_tar_checkbox = QCheckBox("Упаковать результат в один архив .tar")
+        options_layout.addWidget(self.pack_tar_checkbox)
+        self.skip_up_to_date_checkbox = QCheckBox("Пропускать файлы с актуальным JPG")
+        self.skip_up_to_date_checkbox.setChecked(True)
+        options_layout.addWidget(self.skip_up_to_date_checkbox)
         
         settings_layout.addLayout(quality_layout)
+        settings_layout.addLayout(workers_layout)
+        settings_layout.addLayout(preset_layout)
+        settings_layout.addLayout(chroma_layout)
         settings_layout.addLayout(output_layout)
         settings_layout.addLayout(options_layout)
         settings_layout.addStretch()
@@ -167,7 +722,7 @@ class ORFConverterApp(QMainWindow):
         
         # Собираем верхнюю панель
         top_layout.addLayout(file_selection_layout)
-        top_layout.addWidget(self.file_list_widget)
+        top_layout.addWidget(self.file_list_view)
         top_layout.addWidget(settings_group)
         top_layout.addLayout(control_layout)
         top_layout.addWidget(self.progress_bar)
@@ -175,7 +730,7 @@ class ORFConverterApp(QMainWindow):
         # Нижняя панель - лог
         log_group = QGroupBox("Лог выполнения")
         log_layout = QVBoxLayout()
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMaximumHeight(200)
         log_layout.addWidget(self.log_text)
@@ -201,19 +756,17 @@ class ORFConverterApp(QMainWindow):
         if files:
             self.file_list.extend(files)
             self.update_file_list()
-            self.log_text.append(f"Добавлено файлов: {len(files)}")
+            self.log_text.appendPlainText(f"Добавлено файлов: {len(files)}")
             
     def add_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Выберите папку с ORF файлами")
         if folder:
-            orf_files = []
-            for ext in ['*.orf', '*.ORF']:
-                orf_files.extend(Path(folder).rglob(ext))
+            orf_files = list(_iter_orf(folder))
             
             if orf_files:
-                self.file_list.extend([str(f) for f in orf_files])
+                self.file_list.extend(orf_files)
                 self.update_file_list()
-                self.log_text.append(f"Добавлено файлов из папки: {len(orf_files)}")
+                self.log_text.appendPlainText(f"Добавлено файлов из папки: {len(orf_files)}")
             else:
                 QMessageBox.information(self, "Информация", "ORF файлы не найдены в выбранной папке")
                 
@@ -225,13 +778,12 @@ class ORFConverterApp(QMainWindow):
             
     def clear_list(self):
         self.file_list.clear()
-        self.file_list_widget.clear()
-        self.log_text.append("Список файлов очищен")
+        self._files_model.setStringList([])
+        self.log_text.appendPlainText("Список файлов очищен")
         
     def update_file_list(self):
-        self.file_list_widget.clear()
-        for file_path in self.file_list:
-            self.file_list_widget.addItem(os.path.basename(file_path))
+        # Один сброс модели вместо вставки элементов по одному
+        self._files_model.setStringList([os.path.basename(p) for p in self.file_list])
             
     def start_conversion(self):
         if not self.file_list:
@@ -247,42 +799,80 @@ class ORFConverterApp(QMainWindow):
             output_dir = None
             
         # Запускаем конвертацию в отдельном потоке
+        # Канал прогресса: поток пишет по байту на файл, GUI вычитывает все сразу
+        self._progress_rsock, self._progress_wsock = socket.socketpair()
+        self._progress_rsock.setblocking(False)
+        self._progress_notifier = QSocketNotifier(self._progress_rsock.fileno(), QSocketNotifier.Read)
+        self._progress_notifier.activated.connect(self.drain_progress)
+        self._progress_done = 0
+        
         self.conversion_thread = ConversionThread(
             self.file_list,
             output_dir if output_dir else os.path.dirname(self.file_list[0]),
             self.quality_spinbox.value(),
-            self.delete_original_checkbox.isChecked()
+            self.delete_original_checkbox.isChecked(),
+            self.workers_spinbox.value(),
+            self.preset_combo.currentText(),
+            self.pack_tar_checkbox.isChecked(),
+            self._progress_wsock,
+            self.chroma_combo.currentText(),
+            self.skip_up_to_date_checkbox.isChecked()
         )
         
-        self.conversion_thread.progress.connect(self.update_progress)
         self.conversion_thread.log_message.connect(self.add_log_message)
         self.conversion_thread.finished_signal.connect(self.conversion_finished)
         
         self.btn_start.setEnabled(False)
         self.btn_stop.setEnabled(True)
         self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, len(self.file_list))
         self.progress_bar.setValue(0)
         
         self.conversion_thread.start()
-        self.log_text.append("=== Начало конвертации ===")
+        self.log_text.appendPlainText("=== Начало конвертации ===")
         
     def stop_conversion(self):
         if self.conversion_thread and self.conversion_thread.isRunning():
             self.conversion_thread.stop()
             self.conversion_thread.wait()
-            self.log_text.append("Конвертация остановлена пользователем")
+            self.log_text.appendPlainText("Конвертация остановлена пользователем")
+            
+    def drain_progress(self):
+        try:
+            while True:
+                data = self._progress_rsock.recv(4096)
+                if not data:
+                    break
+                self._progress_done += len(data)
+        except BlockingIOError:
+            pass
+        self.update_progress(self._progress_done)
+        
+    def close_progress_channel(self):
+        self._progress_notifier.setEnabled(False)
+        self._progress_notifier = None
+        self._progress_rsock.close()
+        self._progress_wsock.close()
             
     def update_progress(self, value):
         self.progress_bar.setValue(value)
         
     def add_log_message(self, message):
-        self.log_text.append(message)
-        # Автопрокрутка к последнему сообщению
+        self.log_text.appendPlainText(message)
+        # Автопрокрутка к последнему сообщению - один раз за проход цикла событий
+        if not self._log_scroll_pending:
+            self._log_scroll_pending = True
+            QTimer.singleShot(0, self.scroll_log_to_end)
+            
+    def scroll_log_to_end(self):
+        self._log_scroll_pending = False
         self.log_text.verticalScrollBar().setValue(
             self.log_text.verticalScrollBar().maximum()
         )
         
     def conversion_finished(self, success):
+        self.drain_progress()
+        self.close_progress_channel()
         self.btn_start.setEnabled(True)
         self.btn_stop.setEnabled(False)
         self.progress_bar.setVisible(False)
@@ -302,4 +892,5 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file